@@ -1,14 +1,86 @@
 from __future__ import annotations
 import os, re
+# aliased, so that the package level star import does not expose them
+import json as _json
+import time as _time
+from functools import lru_cache as _lru_cache, partial
+from operator import attrgetter, eq, is_, not_
+from itertools import compress, filterfalse, accumulate, chain
 from dataclasses import dataclass
-from typing import List, Dict, Tuple, Optional, Union
+from typing import List, Dict, Tuple, Optional, Union, Callable, Iterable, Iterator, Sequence
 from copy import copy
+from collections import deque, Counter
+from concurrent import futures as _futures
 from .helper import *
 from .error import *
 
 # TODO: apply config parser
 ignore = ['.ipynb_checkpoints']
 
+# directory listings cached at the dataset root when parsing with cache=True
+_CACHE_FILE = '.nip_cache.json'
+_CACHE_VERSION = 2
+# listings of directories modified this close to the scan are not trusted, as a change
+# within the timestamp resolution of the filesystem would not update the mtime
+_CACHE_RACY_NS = 2_000_000_000
+
+# regular expressions for BIDS naming conventions, used with fullmatch
+_SUBJ_RE = re.compile(r'sub-[A-Za-z0-9]+')
+_SESS_RE = re.compile(r'ses-[A-Za-z0-9]+')
+_BIDS_FILE_RE = re.compile(r'sub-[A-Za-z0-9]+(?:_ses-[A-Za-z0-9]+)?.*')
+
+# folder name of a processing step, '<id>_<name>_<annotation>'
+_STEP_PATTERN = re.compile(r"(?P<id>[0-9]{4})_(?P<name>[a-zA-Z0-9\-]+)_(?P<annotation>[a-zA-Z0-9]+)")
+
+
+@_lru_cache(maxsize=256)
+def _get_compiled(regex: Union[str, re.Pattern]) -> re.Pattern:
+    """compile the regular expression once and reuse it for the following calls, compiled patterns are returned as is"""
+    return re.compile(regex)
+
+
+_DEFAULT_FLAGS = re.compile('').flags
+
+
+@_lru_cache(maxsize=256)
+def _get_combined(regex: Union[str, re.Pattern], regex_ignore: Union[str, re.Pattern]) -> Optional[re.Pattern]:
+    """
+    combine the patterns into a single one, which matches where regex matches and regex_ignore does not,
+    returns None if they can not be combined without changing their meaning
+    """
+    keep = _get_compiled(regex)
+    drop = _get_compiled(regex_ignore)
+    # global flags can not be embedded, and groups in the lookahead would shift the group numbers of regex
+    if keep.flags != _DEFAULT_FLAGS or drop.flags != _DEFAULT_FLAGS or drop.groups:
+        return None
+    try:
+        return re.compile(f"(?!(?:{drop.pattern}))(?:{keep.pattern})")
+    except re.error:
+        return None
+
+
+def _isin(values: List[str]) -> Callable[[object], bool]:
+    """returns a test checking whether a value is one of the given values, implemented in C"""
+    values = frozenset(values)
+    if len(values) == 1:
+        (value,) = values
+        return partial(eq, value)
+    return values.__contains__
+
+
+def _narrow(indices: Sequence[int], column: Tuple, test: Callable, negate: bool = False) -> Iterator[int]:
+    """yields the indices whose value in the column passes the test, only the given indices are evaluated, lazily"""
+    mask = map(test, map(column.__getitem__, indices))
+    if negate:
+        mask = map(not_, mask)
+    return compress(indices, mask)
+
+
+def _normalize_ext(ext: str) -> str:
+    """strip the leading, trailing and repeated dots of a file extension"""
+    return ".".join(strip_empty_str_in_list(ext.split(".")))
+
+
 # dataclasses
 @dataclass
 class DataItem:
@@ -16,15 +88,18 @@ class DataItem:
     Contains structured data information.
     
     Attributes:
-        by_depth (Dict[int, Dict[str, List[str]]]): A dictionary with depth as the key and a dictionary of session path and file names as the value.
+        by_depth (Dict[int, Dict[Tuple[str, ...], List[str]]]): A dictionary with depth as the key and a dictionary of session path 
+            components and file names as the value.
     """
-    by_depth: Dict[int, Dict[str, List[str]]]
+    __slots__ = ('by_depth',)
+    by_depth: Dict[int, Dict[Tuple[str, ...], List[str]]]
 
 
-@dataclass
+@dataclass(frozen=True)
 class FileItem:
     """
-    Contains information related to a file.
+    Contains information related to a file. Read-only, as basename and abspath are derived from the other
+    attributes on construction.
 
     Attributes:
         subject (str): The subject associated with the file.
@@ -34,15 +109,17 @@ class FileItem:
         absdir (str): The absolute directory where the file is located.
         filename (str): The name of the file.
         fileext (str): The extension of the file.
+        basename (str): The base name of the file, computed on construction.
+        abspath (str): The absolute path of the file, computed on construction.
 
     Methods:
-        abspath: Return the absolute path of the file.
-        basename: Return the base name of the file.
         modify: Modify the name of the file.
         match: Check if the filename matches a regular expression.
         is_match: Check if the filename matches a regular expression.
         has_ext: Check if the file has a specific extension.
     """
+    __slots__ = ('subject', 'session', 'modal', 'annotation', 'absdir', 'filename', 'fileext',
+                 'basename', 'abspath')
     subject: str
     session: Optional[str]
     modal: Optional[str]
@@ -51,13 +128,16 @@ class FileItem:
     filename: str
     fileext: str
 
-    @property
-    def abspath(self) -> str:
-        return os.path.join(self.absdir, self.basename)
+    def __post_init__(self):
+        # computed once, these are read repeatedly while sorting and filtering
+        basename = f"{self.filename}.{self.fileext}" if self.fileext else self.filename
+        object.__setattr__(self, 'basename', basename)
+        object.__setattr__(self, 'abspath', os.path.join(self.absdir, basename))
 
-    @property
-    def basename(self) -> str:
-        return f"{self.filename}.{self.fileext}"
+    def __reduce__(self):
+        # copy and pickle restore the slots with setattr, which a frozen instance refuses
+        return (self.__class__, (self.subject, self.session, self.modal, self.annotation, 
+                                 self.absdir, self.filename, self.fileext))
 
     def modify(
         self, 
@@ -79,18 +159,19 @@ class FileItem:
         else:
             modified = str(self.filename)
             if replace:
-                compiled = re.compile(replace.regex)
+                compiled = _get_compiled(replace.regex)
                 modified = compiled.sub(replace.replacement, modified)
             if prefix:
                 modified = f"{prefix}{modified}"
             if suffix:
                 modified = f"{modified}{suffix}"
             if ext:
-                ext = ".".join(strip_empty_str_in_list(ext.split(".")))
+                ext = _normalize_ext(ext)
             else:
                 ext = self.fileext
             
-            modified = f"{modified}.{ext}"
+            if ext:
+                modified = f"{modified}.{ext}"
             if absdir:
                 if isinstance(absdir, bool):
                     return os.path.join(self.absdir, modified)
@@ -100,7 +181,7 @@ class FileItem:
                 return modified
 
     def match(self, regex: str) -> Union[dict, Tuple[str], None]:
-        groups = re.compile(regex)
+        groups = _get_compiled(regex)
         matched = groups.match(self.filename)
         if matched:
             if groups.groupindex:
@@ -111,7 +192,7 @@ class FileItem:
             return None
         
     def is_match(self, regex: str) -> bool:
-        groups = re.compile(regex)
+        groups = _get_compiled(regex)
         matched = groups.match(self.filename)
         if matched:
             return True
@@ -151,6 +232,7 @@ class SessionItem:
     Methods:
         length: Return the number of files in the session.
     """
+    __slots__ = ('subject', 'session', 'files')
     subject: str
     session: Optional[str]
     files: Union[List[FileItem], Dict[str, List[FileItem]]]
@@ -189,6 +271,7 @@ class StepItem:
     Methods:
         path: Return the path of the step.
     """
+    __slots__ = ('id', 'name', 'annotation', 'dataset')
     id: str
     name: str
     annotation: str
@@ -208,6 +291,7 @@ class MaskItem:
         modal (str): The modality of the mask.
         dataset (Optional[StepDataset]): The dataset associated with the mask. Can be None.
     """
+    __slots__ = ('modal', 'dataset')
     modal: str
     dataset: Optional[StepDataset]
 
@@ -224,11 +308,74 @@ class Inherits:
         file_list (List[FileInfo]): A list of FileInfo objects.
         session_list (List[SessionInfo]): A list of SessionInfo objects.
     """
+    __slots__ = ('subjects', 'sessions', 'modal', 'file_list', 'session_list')
     subjects: List[str]
     sessions: List[str]
     modal: Optional[List[str]]
     file_list: List[FileItem]
     session_list: List[SessionItem]
+
+
+@dataclass
+class FileTable:
+    """
+    Contains the attributes of a list of FileItem objects stored column by column, so that filters can be 
+    evaluated over each column at once instead of item by item. Files sharing the same subject, session, modal, 
+    annotation and extension belong to the same group, so these criteria only need to be tested once per group.
+
+    Attributes:
+        subject (Tuple[str, ...]): The subject of each file.
+        session (Tuple[Optional[str], ...]): The session of each file.
+        modal (Tuple[Optional[str], ...]): The modal of each file.
+        annotation (Tuple[Optional[str], ...]): The annotation of each file.
+        filename (Tuple[str, ...]): The name of each file.
+        ext (Tuple[str, ...]): The normalized extension of each file.
+        group (Tuple[int, ...]): The group code of each file, an index into groups.
+        groups (List[Tuple]): The distinct (subject, session, modal, annotation, ext) keys, in order of appearance.
+
+    Methods:
+        from_items: Build a FileTable from a list of FileItem objects.
+        rows_of: Return the rows belonging to the given groups.
+    """
+    __slots__ = ('subject', 'session', 'modal', 'annotation', 'filename', 'ext', 'group', 'groups', '_index')
+    subject: Tuple[str, ...]
+    session: Tuple[Optional[str], ...]
+    modal: Tuple[Optional[str], ...]
+    annotation: Tuple[Optional[str], ...]
+    filename: Tuple[str, ...]
+    ext: Tuple[str, ...]
+    group: Tuple[int, ...]
+    groups: List[Tuple]
+
+    @classmethod
+    def from_items(cls, file_list: List[FileItem]) -> FileTable:
+        columns = [tuple(map(attrgetter(attr), file_list)) 
+                   for attr in ('subject', 'session', 'modal', 'annotation', 'filename')]
+        ext = tuple(map(_normalize_ext, map(attrgetter('fileext'), file_list)))
+        keys = list(zip(*columns[:4], ext))
+        groups = list(dict.fromkeys(keys))
+        codes = {key: code for code, key in enumerate(groups)}
+        return cls(*columns, ext, tuple(map(codes.__getitem__, keys)), groups)
+
+    def __post_init__(self):
+        self._index = None
+
+    def rows_of(self, codes: Iterable[int]) -> List[int]:
+        """
+        Return the rows belonging to the given groups in ascending order, without visiting the rows of the other groups.
+        The rows are indexed by group on first use and the index is reused afterwards.
+        """
+        if self._index is None:
+            # stable sort, the rows of each group stay in ascending order
+            order = sorted(range(len(self.group)), key=self.group.__getitem__)
+            counts = Counter(self.group)
+            offsets = list(accumulate(map(counts.__getitem__, range(len(self.groups))), initial=0))
+            self._index = (order, offsets)
+        order, offsets = self._index
+        slices = [order[offsets[code]:offsets[code + 1]] for code in codes]
+        if len(slices) == 1:
+            return slices[0]
+        return sorted(chain.from_iterable(slices))
     
 
 @dataclass
@@ -240,6 +387,7 @@ class Replace:
         regex (str): The regular expression to be matched.
         replacement (str): The string that will replace the matched expression.
     """
+    __slots__ = ('regex', 'replacement')
     regex: str
     replacement: str
 
@@ -256,6 +404,7 @@ class MaxDepthRef:
     Methods:
         list: Returns a list containing the single_session and multi_session values.
     """
+    __slots__ = ('single_session', 'multi_session')
     single_session: int
     multi_session: int
     
@@ -276,6 +425,8 @@ class BaseParser:
     
     Public Attributes:
     - dir_only (bool): If True, only directories will be parsed.
+    - max_workers (int): The number of threads used to scan directories.
+    - cache (bool): If True, directory listings are cached at the root path and reused for unchanged directories.
     - max_depth (int): The maximum depth of the directory tree.
     - subjects (Optional[List[str]]): List of subjects found in the dataset.
     - sessions (Optional[List[str]]): List of sessions found in the dataset.
@@ -285,16 +436,17 @@ class BaseParser:
     
     Private Attributes:
     - _abs_path (str): The absolute path of the root.
-    - _abs_path_list (List[str]): The list representation of the absolute path.
-    - _abs_path_depth (int): The total depth of the root path.
     - _files_by_depth (DataInfo): A dictionary mapping from depth to another dictionary, which maps from relative 
                                   paths to filenames.
     - _dirs_by_depth (DataInfo): A dictionary mapping from depth to another dictionary, which maps from relative 
                                  paths to directory names.
+    - _file_table (FileTable): Column-wise copy of file_list used for filtering, built on the first filter.
     """
     
     # public properties
     dir_only: bool
+    max_workers: int
+    cache: bool
     max_depth: int
     subjects: Optional[List[str]]
     sessions: Optional[List[str]]
@@ -304,8 +456,6 @@ class BaseParser:
     
     # private properties
     _abs_path: str
-    _abs_path_list: List[str]
-    _abs_path_depth: int
     _files_by_depth: DataItem
     _dirs_by_depth: DataItem
 
@@ -314,18 +464,40 @@ class BaseParser:
 
     TODO: implement .nipignore for the project
     """
-    def __init__(self, path: str, dir_only: bool = False):
+    def __init__(self, 
+                 path: str, 
+                 dir_only: bool = False, 
+                 max_workers: Optional[int] = None, 
+                 cache: bool = False):
         """
         Initialize the BaseParser instance.
         
         Parameters:
         - path (str): The root path of the dataset to parse. Default is None.
         - dir_only (bool): If True, only directories will be parsed. Default is False.
+        - max_workers (Optional[int]): The number of threads used to scan directories. Default is None, which
+                                       scans serially. Only worth it where each listing has a high latency, 
+                                       e.g. network-mounted datasets, on local disks the threads cost more 
+                                       than they save.
+        - cache (bool): If True, the directory listings are stored in '.nip_cache.json' at the root path, and 
+                        directories whose (mtime, inode, device) did not change are not listed again on the next
+                        parse. Default is False.
         """
         self.path = path
         self.dir_only = dir_only
+        self.max_workers = max_workers or 1
+        self.cache = cache
         self.parse()
     
+    @property
+    def _file_table(self) -> FileTable:
+        # built on the first filter, and again whenever file_list was replaced or changed in place since
+        cached = getattr(self, '_cached_file_table', None)
+        if cached is None or len(cached[0]) != len(self.file_list) or \
+                not all(map(is_, cached[0], self.file_list)):
+            cached = self._cached_file_table = (tuple(self.file_list), FileTable.from_items(self.file_list))
+        return cached[1]
+
     def parse(self):
         self._init_process()
         self._parse_all()
@@ -336,17 +508,11 @@ class BaseParser:
 
         Attributes:
         - _abs_path (str): The absolute path of the root.
-        - _abs_path_list (list): The list representation of the absolute path.
-        - _abs_path_depth (int): The total depth of the root path.
         """
-        abs_path = os.path.abspath(self.path)
-        abs_path_list = strip_empty_str_in_list(abs_path.split(os.path.sep))
-        abs_path_depth = len(abs_path_list)
+        abs_path = os.path.abspath(os.fspath(self.path))
         
         #store to class's private attributes
         self._abs_path = abs_path
-        self._abs_path_list = abs_path_list
-        self._abs_path_depth = abs_path_depth
         
     def _parse_all(self):
         """
@@ -354,9 +520,9 @@ class BaseParser:
 
         Private Attributes:
         - _files_by_depth (dict): A dictionary mapping from depth to another dictionary, which maps from relative 
-                                  paths to filenames.
+                                  path components (tuple) to filenames.
         - _dirs_by_depth (dict): A dictionary mapping from depth to another dictionary, which maps from relative 
-                                 paths to directory names.
+                                 path components (tuple) to directory names.
 
         Public Attributes:
         - max_depth (int): The maximum depth of the directory tree.
@@ -364,34 +530,261 @@ class BaseParser:
         max_depth = 0
         files_by_depth = dict()
         dirs_by_depth = dict()
-        for (dirpath, dirnames, filenames) in os.walk(self._abs_path):
-            dirpath = str_to_list(dirpath)
-            relpath = dirpath[self._abs_path_depth:]
-            depth_step = len(relpath)
-            # filter dirs in ignore list
-            dirnames = [d for d in dirnames if d not in ignore]
-            # filter path in ignore list
-            ignored = [d for d in dirpath if d in ignore]
-            
-            if len(ignored) == 0:
-                if len(dirnames) == 0:
-                    # update max depth
-                    if depth_step > max_depth:
-                        max_depth = depth_step
-                else:
-                    if depth_step not in dirs_by_depth.keys():
-                        dirs_by_depth[depth_step] = dict()
-                    dirs_by_depth[depth_step][os.path.sep.join(relpath)] = sorted(dirnames)
+        for (depth_step, relpath, dirnames, filenames) in self._walk():
+            if len(dirnames) == 0:
+                # update max depth
+                if depth_step > max_depth:
+                    max_depth = depth_step
+            else:
+                if depth_step not in dirs_by_depth.keys():
+                    dirs_by_depth[depth_step] = dict()
+                dirs_by_depth[depth_step][relpath] = sorted(dirnames)
 
-                if not self.dir_only:
-                    if len(filenames):
-                        if depth_step not in files_by_depth.keys():
-                            files_by_depth[depth_step] = dict()    
-                        files_by_depth[depth_step][os.path.sep.join(relpath)] = sorted(filenames)
+            if not self.dir_only:
+                if len(filenames):
+                    if depth_step not in files_by_depth.keys():
+                        files_by_depth[depth_step] = dict()
+                    files_by_depth[depth_step][relpath] = sorted(filenames)
 
         self._files_by_depth = files_by_depth
         self._dirs_by_depth = dirs_by_depth
         self.max_depth = max_depth
+
+    def _walk(self):
+        """
+        Walk the directory tree under the root path, see _walk_tree.
+
+        If cache is enabled, the listings of the previous parse are reused for unchanged directories,
+        and the cache is updated once the walk is completed.
+
+        Yields:
+        - Tuple: depth, relative path components, directory names and file names of each directory.
+        """
+        if self.cache:
+            started_ns = _time.time_ns()
+            cached = self._load_cache()
+            recorded = dict()
+            scan_dir = partial(self._scan_cached, cached=cached, recorded=recorded)
+        else:
+            scan_dir = self._scan_dir
+        for depth_step, relpath, dirnames, filenames in self._walk_tree(self._abs_path, None, scan_dir, self.max_workers):
+            if self.cache and not depth_step:
+                # the cache file is not a part of the dataset
+                filenames = [f for f in filenames if f not in (_CACHE_FILE, f"{_CACHE_FILE}.tmp")]
+            yield depth_step, relpath, dirnames, filenames
+        if self.cache:
+            self._save_cache(recorded, cached, started_ns)
+
+    @classmethod
+    def _walk_tree(cls, 
+                   root: str, 
+                   subpaths: Optional[List[str]] = None, 
+                   scan_dir: Optional[Callable] = None, 
+                   max_workers: int = 1) -> Iterator[Tuple[int, Tuple[str, ...], List[str], List[str]]]:
+        """
+        Walk the directory tree under root in the same top-down order as os.walk.
+
+        When max_workers is larger than 1, all directories are scanned by a thread pool first so that
+        many scandir calls are in flight at once (e.g. on network-mounted datasets), and the results
+        are then replayed in order.
+
+        Parameters:
+        - root (str): The path of the root directory.
+        - subpaths (Optional[List[str]]): Names of the subdirectories of root to walk, in order. Default is None, 
+                                          which walks the whole tree. If given, root itself is not listed.
+        - scan_dir (Optional[Callable]): The function used to list a single directory. Default is _scan_dir.
+        - max_workers (int): The number of threads used to scan directories. Default is 1.
+
+        Yields:
+        - Tuple: depth, relative path components, directory names and file names of each directory.
+        """
+        # skip everything if the root itself is located under the ignore list
+        if any(d in ignore for d in str_to_list(os.path.abspath(root))):
+            return
+        if scan_dir is None:
+            scan_dir = cls._scan_dir
+        if subpaths is None:
+            starts = [(root, 0, ())]
+        else:
+            starts = [(os.path.join(root, name), 1, (name,)) for name in subpaths if name not in ignore]
+        if max_workers > 1:
+            scanned = cls._scan_parallel([path for path, _, _ in starts], scan_dir, max_workers)
+            scan = scanned.get
+        else:
+            scan = scan_dir
+        stack = deque(reversed(starts))
+        while stack:
+            dirpath, depth_step, relpath = stack.pop()
+            result = scan(dirpath)
+            if result is None:
+                # unreadable directory, skip as os.walk does
+                continue
+            dirnames, filenames, subdirs = result
+            # push in reverse to keep the top-down order of os.walk
+            for name, path in reversed(subdirs):
+                stack.append((path, depth_step + 1, relpath + (name,)))
+            yield depth_step, relpath, dirnames, filenames
+
+    @staticmethod
+    def _scan_parallel(dirpaths: List[str], 
+                       scan_dir: Callable,
+                       max_workers: int) -> Dict[str, Optional[Tuple[List[str], List[str], List[Tuple[str, str]]]]]:
+        """
+        Scan all directories under the given paths with a thread pool.
+
+        Subdirectories found by a worker are submitted back to the pool, and the results are only
+        collected by the calling thread, thus no lock is required.
+
+        Parameters:
+        - dirpaths (List[str]): The paths of the directories to start from.
+        - scan_dir (Callable): The function used to list a single directory.
+        - max_workers (int): The number of threads.
+
+        Returns:
+        - Dict: A dictionary mapping from directory path to the result of _scan_dir.
+        """
+        scanned = dict()
+        with _futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(scan_dir, dirpath): dirpath for dirpath in dirpaths}
+            while pending:
+                done, _ = _futures.wait(pending, return_when=_futures.FIRST_COMPLETED)
+                for future in done:
+                    result = scanned[pending.pop(future)] = future.result()
+                    if result is not None:
+                        for _, path in result[2]:
+                            pending[executor.submit(scan_dir, path)] = path
+        return scanned
+
+    @staticmethod
+    def _scan_dir(dirpath: str) -> Optional[Tuple[List[str], List[str], List[Tuple[str, str]]]]:
+        """
+        List a single directory with os.scandir.
+
+        Returns:
+        - Tuple: directory names, file names, and (name, path) of subdirectories to descend into,
+                 or None if the directory could not be read.
+        """
+        dirnames = []
+        filenames = []
+        subdirs = []
+        try:
+            with os.scandir(dirpath) as entries:
+                for entry in entries:
+                    # file type is taken from the cached dirent, only symlinks need an extra stat
+                    if entry.is_dir():
+                        # filter dirs in ignore list
+                        if entry.name in ignore:
+                            continue
+                        dirnames.append(entry.name)
+                        # do not follow symlinked dirs, same as os.walk
+                        if not entry.is_symlink():
+                            subdirs.append((entry.name, entry.path))
+                    else:
+                        filenames.append(entry.name)
+        except OSError:
+            return None
+        return dirnames, filenames, subdirs
+
+    @classmethod
+    def _scan_cached(cls, 
+                     dirpath: str, 
+                     cached: Dict[str, list], 
+                     recorded: Dict[str, list]) -> Optional[Tuple[List[str], List[str], List[Tuple[str, str]]]]:
+        """
+        List a single directory, reusing the cached listing if the directory has not been modified since.
+
+        Parameters:
+        - dirpath (str): The path of the directory to list.
+        - cached (Dict[str, list]): The listings loaded from the cache, mapping from directory path to 
+                                    its fingerprint, directory names, file names and names of the 
+                                    subdirectories to descend into.
+        - recorded (Dict[str, list]): The listings of the current parse, updated in place.
+
+        Returns:
+        - Tuple: The same as _scan_dir.
+        """
+        try:
+            stat = os.stat(dirpath)
+        except OSError:
+            return None
+        # integer timestamp to avoid floating point comparison
+        fingerprint = [stat.st_mtime_ns, stat.st_ino, stat.st_dev]
+        item = cached.get(dirpath)
+        result = cls._cached_listing(dirpath, item, fingerprint) if item is not None else None
+        if result is None:
+            result = cls._scan_dir(dirpath)
+        if result is not None:
+            dirnames, filenames, subdirs = result
+            # single dict assignment is atomic, safe to be called from the worker threads
+            recorded[dirpath] = [fingerprint, dirnames, filenames, [name for name, _ in subdirs]]
+        return result
+
+    @staticmethod
+    def _cached_listing(dirpath: str, 
+                        item: list, 
+                        fingerprint: List[int]) -> Optional[Tuple[List[str], List[str], List[Tuple[str, str]]]]:
+        """
+        Rebuild the listing of a directory from its cache entry.
+
+        Returns:
+        - Tuple: The same as _scan_dir, or None if the entry is outdated or malformed.
+        """
+        try:
+            cached_fingerprint, dirnames, filenames, subnames = item
+            if cached_fingerprint != fingerprint:
+                return None
+            # only plain names of listed directories are descended into, so that an edited cache 
+            # can not lead the walk outside of the dataset
+            seps = (os.sep, os.altsep) if os.altsep else (os.sep,)
+            if not set(subnames) <= set(dirnames) or \
+                    any(name in ('', '.', '..') or any(sep in name for sep in seps) for name in subnames):
+                return None
+        except (TypeError, ValueError):
+            return None
+        # the paths are derived from the directory, never taken from the cache file
+        return dirnames, filenames, [(name, os.path.join(dirpath, name)) for name in subnames]
+
+    def _load_cache(self) -> Dict[str, list]:
+        """
+        Load the directory listings cached at the root path.
+
+        Returns:
+        - Dict: A dictionary mapping from directory path to its fingerprint and listing, 
+                empty if there is no valid cache.
+        """
+        try:
+            with open(os.path.join(self._abs_path, _CACHE_FILE)) as f:
+                cache = _json.load(f)
+        except (OSError, ValueError):
+            return dict()
+        if not isinstance(cache, dict) or cache.get('version') != _CACHE_VERSION or \
+                not isinstance(cache.get('dirs'), dict):
+            return dict()
+        return cache['dirs']
+
+    def _save_cache(self, recorded: Dict[str, list], cached: Dict[str, list], started_ns: int):
+        """
+        Store the directory listings of the current parse at the root path, if anything has changed.
+
+        Parameters:
+        - recorded (Dict[str, list]): The listings of the current parse.
+        - cached (Dict[str, list]): The listings loaded from the cache.
+        - started_ns (int): The time when the current parse started, in nanoseconds.
+        """
+        threshold = started_ns - _CACHE_RACY_NS
+        # the root is left out, as writing the cache file changes its mtime on every parse
+        dirs = {path: item for path, item in recorded.items()
+                if path != self._abs_path and item[0][0] < threshold}
+        if {p: i[0] for p, i in dirs.items()} == {p: i[0] for p, i in cached.items() if p != self._abs_path}:
+            return
+        cache_path = os.path.join(self._abs_path, _CACHE_FILE)
+        try:
+            with open(f"{cache_path}.tmp", 'w') as f:
+                _json.dump({'version': _CACHE_VERSION, 'dirs': dirs}, f)
+            os.replace(f"{cache_path}.tmp", cache_path)
+        except OSError:
+            # e.g. read-only dataset, the next parse will list all directories again
+            pass
     
     @classmethod
     def _validator(cls, 
@@ -411,6 +804,7 @@ class BaseParser:
         The validated subjects and sessions are stored in the `subjects` and `sessions` attributes of the instance.
 
         Raises:
+        - EmptyDatasetError: If the dataset contains no subdirectories, or no files at its depth.
         - ValueError: If the dataset depth is not compliant with BIDS standards.
         - UserWarning: If subject, session, or file names are not compliant with BIDS naming conventions, 
             a warning is issued instead of raising an error.
@@ -419,47 +813,45 @@ class BaseParser:
         - A tuple of three lists containing the validated subjects, sessions, and modals.
         """
         # check dataset depth, 2 for single session and 3 for multi session dataset
+        if max_depth == 0:
+            raise EmptyDatasetError("Empty dataset: no subject folder found.")
         if max_depth not in ref.list:
             raise ValueError(f"Invalid dataset depth: {max_depth}. Expected depth is {ref.single_session} "
                              f"for single session or {ref.multi_session} for multi session dataset.")
-        
-        # define regular expressions for BIDS naming conventions
-        subj_pattern = re.compile(r'sub-[a-zA-Z0-9]+')
-        sess_pattern = re.compile(r'ses-[a-zA-Z0-9]+')
-        file_pattern = re.compile(r'sub-[a-zA-Z0-9]+(_ses-[a-zA-Z0-9]+)?.*')
+        # e.g. a step folder created before any output was written
+        if not dir_only and max_depth not in files.by_depth:
+            raise EmptyDatasetError("Empty dataset: no file found at the dataset depth.")
         
         # validate subject names
-        subjects = sorted([s for s in dirs.by_depth[0]['']])
-        is_subjects = [subj_pattern.match(s) != None for s in subjects]
+        subjects = sorted([s for s in dirs.by_depth[0][()]])
+        is_subjects = [_SUBJ_RE.fullmatch(s) is not None for s in subjects]
         if not all(is_subjects):
-            for i, subj in enumerate(subjects):
-                # If a subject name does not match the required pattern, warn about a potential compliance issue
-                if not is_subjects[i]:
-                    warn(f"The folder '{subj}' is excluded because it does not match the expected 'sub-*' format.", UserWarning)
-            subjects = [s for i, s in enumerate(subjects) if is_subjects[i]]
+            # If a subject name does not match the required pattern, warn about a potential compliance issue
+            for subj in [s for s, ok in zip(subjects, is_subjects) if not ok]:
+                warn(f"The folder '{subj}' is excluded because it does not match the expected 'sub-*' format.", UserWarning)
+            subjects = [s for s, ok in zip(subjects, is_subjects) if ok]
         
         # if multi session dataset, validate session names
         if max_depth == ref.multi_session:
-            sessions = sorted(list(set([sess for sesses in dirs.by_depth[ref.multi_session].values() for sess in sesses])))
-            is_sessions = [sess_pattern.match(s) != None for s in sessions]
+            sessions = sorted(list(set([sess for sesses in dirs.by_depth[1].values() for sess in sesses])))
+            is_sessions = [_SESS_RE.fullmatch(s) is not None for s in sessions]
             if not all(is_sessions):
-                for i, sess in enumerate(sessions):
-                    # If a session name does not match the required pattern, warn about a potential compliance issue
-                    if not is_sessions[i]:
-                        warn(f"The folder '{sess}' is excluded because it does not match the expected 'ses-*' format.", UserWarning)
-                sessions = [s for i, s in enumerate(sessions) if is_sessions[i]]
+                # If a session name does not match the required pattern, warn about a potential compliance issue
+                for sess in [s for s, ok in zip(sessions, is_sessions) if not ok]:
+                    warn(f"The folder '{sess}' is excluded because it does not match the expected 'ses-*' format.", UserWarning)
+                sessions = [s for s, ok in zip(sessions, is_sessions) if ok]
         else:
             sessions = None
 
         # if files are included in parsing, validate file names
         if not dir_only:
-            filenames = sorted([filename for sess in files.by_depth[max_depth].values() for filename in sess])
-            is_not_bidsfiles = [filename for filename in filenames if file_pattern.match(filename) == None]
+            filenames = [filename for sess in files.by_depth[max_depth].values() for filename in sess]
+            is_not_bidsfiles = set(filterfalse(_BIDS_FILE_RE.fullmatch, filenames))
             if len(is_not_bidsfiles):
                 for relpath, sess in files.by_depth[max_depth].items():
                     for filename in sess:
                         if filename in is_not_bidsfiles:
-                            filepath = os.path.join(relpath, filename)
+                            filepath = os.path.join(*relpath, filename)
                             warn(f"'{filepath}' does not match the expected BIDS file format.", UserWarning)
         
         # returns validated subjects and sessions
@@ -501,14 +893,19 @@ class BaseParser:
         - ref (MaxDepthRef): Reference to the maximum depth.
         - modal (bool): If True, the modal attribute will be considered. Default is False.
 
+        Raises:
+        - EmptyDatasetError: If there are no files at the dataset depth, when constructed without validation.
+
         Returns:
         - Tuple: A tuple containing a list of SessionInfo objects and a list of FileInfo objects.
         """
+        if self.max_depth not in files.by_depth:
+            raise EmptyDatasetError("Empty dataset: no file found at the dataset depth.")
     
         # prep spaceholders
-        processed = []
-        session_list = []
+        sessions_by_id: Dict[str, SessionItem] = {}
         file_list = []
+        annotation = os.path.basename(self._abs_path)
         
         # loop over the paths at max depth
         for sess_path, filenames in files.by_depth[self.max_depth].items():
@@ -516,16 +913,16 @@ class BaseParser:
             # parse meta data
             if self.max_depth == ref.single_session:
                 if modal:
-                    subj, modal = str_to_list(sess_path)
+                    subj, modal = sess_path
                 else:
-                    subj = str_to_list(sess_path)[0]
+                    (subj,) = sess_path
                     modal = None
                 sess = None
             elif self.max_depth == ref.multi_session:
                 if modal:
-                    subj, sess, modal = str_to_list(sess_path)
+                    subj, sess, modal = sess_path
                 else:
-                    subj, sess = str_to_list(sess_path)
+                    subj, sess = sess_path
                     modal = None
             else:
                 raise ValueError(f"Invalid dataset depth: {self.max_depth}. Expected depth is {ref.single_session} "
@@ -533,19 +930,17 @@ class BaseParser:
 
             # construct session and file lists
             task_id = f"{subj}-{sess}"
-            if task_id in processed:
-                sinfo = [si for si in session_list if si.subject == subj and si.session == sess][0]
-            else:
+            sinfo = sessions_by_id.get(task_id)
+            if sinfo is None:
                 if modal:
                     sinfo = SessionItem(subj, sess, {})
                 else:
                     sinfo = SessionItem(subj, sess, [])
-                session_list.append(sinfo)
-                processed.append(task_id)
+                sessions_by_id[task_id] = sinfo
             for f in filenames:
-                filename, fileext = f.split('.', 1)
-                finfo = FileItem(subj, sess, modal, self._abs_path_list[-1], 
-                                 os.path.join(self._abs_path, sess_path), filename, fileext)
+                filename, _, fileext = f.partition('.')
+                finfo = FileItem(subj, sess, modal, annotation, 
+                                 os.path.join(self._abs_path, *sess_path), filename, fileext)
                 if modal:
                     if modal not in sinfo.files.keys():
                         sinfo.files[modal] = []
@@ -554,15 +949,18 @@ class BaseParser:
                 else:
                     sinfo.files.append(finfo)
                     file_list.append(finfo)
-            
-            if modal:
-                sinfo.files[modal] = sorted(sinfo.files[modal], key=lambda x: (x.filename, x.fileext))
-            else:        
-                sinfo.files = sorted(sinfo.files, key=lambda x: (x.modal, x.filename, x.fileext))
+        
+        # sort the files of each session once all of them are collected
+        for sinfo in sessions_by_id.values():
+            if isinstance(sinfo.files, dict):
+                for finfos in sinfo.files.values():
+                    finfos.sort(key=attrgetter('filename', 'fileext'))
+            else:
+                sinfo.files.sort(key=attrgetter('modal', 'filename', 'fileext'))
         
         # sort constructed lists and returns
-        session_list = sorted(session_list, key=lambda x: (x.subject, x.session))
-        file_list = sorted(file_list, key=lambda x: (x.subject, x.session, x.modal, x.filename, x.fileext))
+        session_list = sorted(sessions_by_id.values(), key=attrgetter('subject', 'session'))
+        file_list.sort(key=attrgetter('subject', 'session', 'modal', 'filename', 'fileext'))
         return session_list, file_list
 
     @classmethod
@@ -573,9 +971,10 @@ class BaseParser:
                 session: Union[List[str], str, None] = None,
                 modal: Union[List[str], str, None] = None,
                 annotation: Union[List[str], str, None] = None,
-                regex: Optional[str] = None,
-                regex_ignore: Optional[str] = None,
-                ext: Optional[str] = None):
+                regex: Union[str, re.Pattern, None] = None,
+                regex_ignore: Union[str, re.Pattern, None] = None,
+                ext: Optional[str] = None,
+                file_table: Optional[FileTable] = None):
         """
         Filter the file list and session list based on the specified criteria.
 
@@ -586,104 +985,142 @@ class BaseParser:
         - session (Union[List[str], str, None]): Session(s) to filter by. Default is None.
         - modal (Union[List[str], str, None]): Modal(s) to filter by. Default is None.
         - annotation (Union[List[str], str, None]): Annotation(s) to filter by. Default is None.
-        - regex (Optional[str]): Regex pattern to filter by. Default is None.
-        - regex_ignore (Optional[str]): Regex pattern to ignore. Default is None.
+        - regex (Union[str, re.Pattern, None]): Regex pattern (or compiled pattern) to filter by. Default is None.
+        - regex_ignore (Union[str, re.Pattern, None]): Regex pattern (or compiled pattern) to ignore. Default is None.
         - ext (Optional[str]): File extension to filter by. Default is None.
+        - file_table (Optional[FileTable]): Column-wise copy of file_list, built from file_list if not provided. 
+                                            Default is None.
 
         Returns:
         - filtered_file_list, filtered_sess_list: Filtered lists of FileInfo and SessionInfo objects.
         """
-        filtered_file_list = copy(file_list)
-        filtered_sess_list = copy(session_list)
+        if any([subject, session, modal, annotation, regex, regex_ignore, ext]):
+            filtered_file_list = list(cls._filter_iter(file_list, subject, session, modal, annotation,
+                                                       regex, regex_ignore, ext, file_table))
+        else:
+            # the lists are never mutated, only rebound, so there is no need to copy
+            filtered_file_list = file_list
+
+        # (attribute getter, test) per criterion
+        sess_tests = []
         if subject:
             if isinstance(subject, str):
                 subject = [subject]
-            filtered_file_list = [finfo for finfo in filtered_file_list if finfo.subject in subject]
-            filtered_sess_list = [sinfo for sinfo in filtered_sess_list if sinfo.subject in subject]
+            sess_tests.append((attrgetter('subject'), _isin(subject)))
         if session:
             if isinstance(session, str):
                 session = [session]
-            filtered_file_list = [finfo for finfo in filtered_file_list if finfo.session in session]
-            filtered_sess_list = [sinfo for sinfo in filtered_sess_list if sinfo.session in session]
+            sess_tests.append((attrgetter('session'), _isin(session)))
+        filtered_sess_list = [sinfo for sinfo in session_list 
+                              if all(test(get(sinfo)) for get, test in sess_tests)]
+
+        if any([modal, annotation, regex, regex_ignore, ext]):
+            # the files of the sessions were filtered along with file_list, they are not tested again
+            filtered_sess_list = cls._session_filter(filtered_sess_list, filtered_file_list)
+        
+        return filtered_file_list, filtered_sess_list
+    
+    @classmethod
+    def _filter_iter(cls,
+                     file_list: List[FileItem],
+                     subject: Union[List[str], str, None] = None, 
+                     session: Union[List[str], str, None] = None,
+                     modal: Union[List[str], str, None] = None,
+                     annotation: Union[List[str], str, None] = None,
+                     regex: Union[str, re.Pattern, None] = None,
+                     regex_ignore: Union[str, re.Pattern, None] = None,
+                     ext: Optional[str] = None,
+                     file_table: Optional[FileTable] = None) -> Iterator[FileItem]:
+        """
+        Iterate over the files matching the specified criteria.
+
+        The categorical criteria select the rows of the matching groups up front, each filename pattern then narrows
+        the surviving row indices. The last stage is evaluated lazily, as the files are consumed.
+
+        Parameters:
+        - file_list (List[FileInfo]): List of FileInfo objects to filter.
+        - subject, session, modal, annotation, regex, regex_ignore, ext: Same as _filter.
+        - file_table (Optional[FileTable]): Column-wise copy of file_list, built from file_list if not provided. 
+                                            Default is None.
+
+        Yields:
+        - FileInfo: The files matching all criteria, in the order of file_list.
+        """
+        if file_table is None:
+            file_table = FileTable.from_items(file_list)
+        # (position in the group key, test) per categorical criterion, evaluated once per group
+        group_tests = []
+        if subject:
+            if isinstance(subject, str):
+                subject = [subject]
+            group_tests.append((0, _isin(subject)))
+        if session:
+            if isinstance(session, str):
+                session = [session]
+            group_tests.append((1, _isin(session)))
         if modal:
             if isinstance(modal, str):
                 modal = [modal]
-            filtered_file_list = [finfo for finfo in filtered_file_list if finfo.modal in modal]
+            group_tests.append((2, _isin(modal)))
         if annotation:
             if isinstance(annotation, str):
                 annotation = [annotation]
-            filtered_file_list = [finfo for finfo in filtered_file_list if finfo.annotation in annotation]
+            group_tests.append((3, _isin(annotation)))
         if ext:
-            filtered_file_list = [finfo for finfo in filtered_file_list if finfo.has_ext(ext)]
-        if regex:
-            filtered_file_list = [finfo for finfo in filtered_file_list if finfo.is_match(regex)]
-        if regex_ignore:
-            filtered_file_list = [finfo for finfo in filtered_file_list if not finfo.is_match(regex_ignore)]
-        
-        filtered_sess_list = cls._session_filter(filtered_sess_list,
-                                                 modal,
-                                                 annotation,
-                                                 regex,
-                                                 regex_ignore,
-                                                 ext)
+            group_tests.append((4, _isin([_normalize_ext(ext)])))
+        # one (column, test) stage per filename pattern, each stage only evaluates the rows surviving the previous ones
+        stages = []
+        # a single pass of the regex engine when both patterns are given
+        combined = _get_combined(regex, regex_ignore) if regex and regex_ignore else None
+        if combined:
+            stages.append((file_table.filename, combined.match))
+        else:
+            if regex:
+                stages.append((file_table.filename, _get_compiled(regex).match))
+            if regex_ignore:
+                stages.append((file_table.filename, _get_compiled(regex_ignore).match, True))
         
-        return filtered_file_list, filtered_sess_list
-    
+        indices = range(len(file_list))
+        if group_tests:
+            passed = [all(test(key[pos]) for pos, test in group_tests) for key in file_table.groups]
+            indices = file_table.rows_of(compress(range(len(passed)), passed))
+        for stage in stages[:-1]:
+            indices = list(_narrow(indices, *stage))
+        if stages:
+            indices = _narrow(indices, *stages[-1])
+        yield from map(file_list.__getitem__, indices)
+
     @classmethod
     def _session_filter(cls, 
                         session_list: List[SessionItem],
-                        modal: Union[List[str], str, None] = None,
-                        annotation: Union[List[str], str, None] = None,
-                        regex: Optional[str] = None, 
-                        regex_ignore: Optional[str] = None, 
-                        ext: Optional[str] = None):
+                        filtered_file_list: List[FileItem]) -> List[SessionItem]:
         """
-        Filter the session list based on the specified criteria.
+        Restrict the files of each session to the ones in the filtered file list.
 
         Parameters:
         - session_list (List[SessionInfo]): List of SessionInfo objects to filter.
-        - modal (Union[List[str], str, None]): Modal(s) to filter by. Default is None.
-        - annotation (Union[List[str], str, None]): Annotation(s) to filter by. Default is None.
-        - regex (Optional[str]): Regex pattern to filter by. Default is None.
-        - regex_ignore (Optional[str]): Regex pattern to ignore. Default is None.
+        - filtered_file_list (List[FileInfo]): The files of the sessions which passed the filter.
 
         Returns:
-        - filtered_sess_list: Filtered list of SessionInfo objects.
+        - filtered_sess_list: List of copied SessionInfo objects holding the filtered files, 
+                              in the order of filtered_file_list.
         """
+        # single pass over the surviving files, grouped by session and then by modal
+        files_by_session = {}
+        for finfo in filtered_file_list:
+            files_by_session.setdefault((finfo.subject, finfo.session), []).append(finfo)
+
         session_list = [copy(s) for s in session_list]
-        for sess in session_list:   
-            if modal:
-                if isinstance(modal, str):
-                    modal = [modal]
-                if isinstance(sess.files, dict):
-                    sess.files = {m:[f for f in fs if f.modal in modal] for m, fs in sess.files.items()}
-                else:
-                    sess.files = [finfo for finfo in sess.files if finfo.modal in modal]
-            if annotation:
-                if isinstance(annotation, str):
-                    annotation = [annotation]
-                if isinstance(sess.files, dict):
-                    sess.files = {m:[f for f in fs if f.annotation in annotation] for m, fs in sess.files.items()}
-                else:
-                    sess.files = [finfo for finfo in sess.files if finfo.annotation in annotation]
-            if regex:
-                if isinstance(sess.files, dict):
-                    sess.files = {m:[f for f in fs if f.is_match(regex)] for m, fs in sess.files.items()}
-                else:
-                    sess.files = [finfo for finfo in sess.files if finfo.is_match(regex)]
-            if regex_ignore:
-                if isinstance(sess.files, dict):
-                    sess.files = {m:[f for f in fs if not f.is_match(regex_ignore)] for m, fs in sess.files.items()}
-                else:
-                    sess.files = [finfo for finfo in sess.files if not finfo.is_match(regex_ignore)]
-            if ext:
-                if isinstance(sess.files, dict):
-                    sess.files = {m:[f for f in fs if f.has_ext(ext)] for m, fs in sess.files.items()}
-                else:
-                    sess.files = [finfo for finfo in sess.files if finfo.has_ext(ext)]
+        for sess in session_list:
+            files = files_by_session.get((sess.subject, sess.session), [])
             if isinstance(sess.files, dict):
-                sess.files = {k:v for k, v in sess.files.items() if len(v)}
-            
+                files_by_modal = {}
+                for finfo in files:
+                    files_by_modal.setdefault(finfo.modal, []).append(finfo)
+                # keep the modal order of the session
+                sess.files = {m: files_by_modal[m] for m in sess.files.keys() if m in files_by_modal}
+            else:
+                sess.files = files
         return session_list
 
 
@@ -769,6 +1206,9 @@ class RawDataset(BaseParser):
         Returns:
         RawDataset: A new instance of StepDataset with filtered data.
         """
+        # compile once here, the patterns are passed through to the filter methods
+        regex = _get_compiled(regex) if regex else None
+        regex_ignore = _get_compiled(regex_ignore) if regex_ignore else None
         file_list, sess_list = self._filter(self.file_list, 
                                             self.session_list,
                                             subject,
@@ -777,11 +1217,13 @@ class RawDataset(BaseParser):
                                             annotation,
                                             regex,
                                             regex_ignore,
-                                            ext)
+                                            ext,
+                                            self._file_table)
         
         inherits = Inherits(self.subjects, self.sessions, self.modals,
                             file_list, sess_list)
-        return RawDataset(self.path, False, inherits)
+        return RawDataset(self.path, False, inherits, 
+                          max_workers=self.max_workers, cache=self.cache)
             
 
 class StepDataset(BaseParser):
@@ -804,7 +1246,9 @@ class StepDataset(BaseParser):
                  path: str, 
                  validate: bool = True, 
                  inherits: Optional[Inherits] = None,
-                 *args, **kwargs):
+                 *args, 
+                 _walked: Optional[List[Tuple[int, Tuple[str, ...], List[str], List[str]]]] = None,
+                 **kwargs):
         """
         Initialize the StepDataset instance.
 
@@ -815,6 +1259,8 @@ class StepDataset(BaseParser):
         *args: Variable length argument list.
         **kwargs: Arbitrary keyword arguments.
         """
+        # records of the step folder from the walk of its ProcDataset, used by the first parse instead of walking
+        self._walked = _walked
         super().__init__(path, *args, **kwargs)
         if validate:
             self._validate()
@@ -823,6 +1269,13 @@ class StepDataset(BaseParser):
         else:
             self._construct()
 
+    def _walk(self):
+        walked, self._walked = self._walked, None
+        if walked is None:
+            yield from super()._walk()
+        else:
+            yield from walked
+
     def _validate(self):
         """
         Validate the dataset structure according to the provided reference and modality.
@@ -869,6 +1322,9 @@ class StepDataset(BaseParser):
         StepDataset: A new instance of StepDataset with filtered data.
         """
        
+        # compile once here, the patterns are passed through to the filter methods
+        regex = _get_compiled(regex) if regex else None
+        regex_ignore = _get_compiled(regex_ignore) if regex_ignore else None
         file_list, sess_list = self._filter(self.file_list, 
                                             self.session_list,
                                             subject,
@@ -877,11 +1333,13 @@ class StepDataset(BaseParser):
                                             annotation,
                                             regex,
                                             regex_ignore,
-                                            ext)
+                                            ext,
+                                            self._file_table)
         
         inherits = Inherits(self.subjects, self.sessions, self.modals,
                             file_list, sess_list)
-        return StepDataset(self.path, False, inherits)
+        return StepDataset(self.path, False, inherits, 
+                           max_workers=self.max_workers, cache=self.cache)
 
 
 class ProcDataset:
@@ -891,49 +1349,67 @@ class ProcDataset:
     Attributes:
         path (str): The root path of the dataset to process.
         is_mask (bool): Flag indicating if the dataset is a mask.
+        max_workers (Optional[int]): Number of threads used to scan the directories, see BaseParser.
 
     Methods:
         __init__: Initialize the ProcDataset instance.
         _parse: Parse the dataset.
-        _subpath: Return a subpath within the dataset.
         _scan_subpath: Scan a subpath and return a StepDataset.
+        _try_scan_subpath: Scan a subpath, return None if it holds no dataset.
         get_dataset: Return a dataset based on a provided target.
         avail: Return a list of available datasets.
     """
-    def __init__(self, path: str, mask: bool = False):
+    def __init__(self, path: str, mask: bool = False, max_workers: Optional[int] = None):
         self.path = path
         self.is_mask = mask
+        self.max_workers = max_workers
         self._parse()
 
     def _parse(self):
+        # the file type is taken from the cached dirent, no extra stat per entry
+        subpaths = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                if self.is_mask:
+                    subpaths.append(((entry.name,), entry))
+                else:
+                    matched = _STEP_PATTERN.match(entry.name)
+                    if matched:
+                        subpaths.append((matched.group("id", "name", "annotation"), entry))
+        item_cls = MaskItem if self.is_mask else StepItem
+
+        # walk the subpaths at once and hand the records under each of them to its dataset, 
+        # other folders are not walked, symlinked subpaths are not followed and are parsed on their own
+        walked = {entry.name: [] for _, entry in subpaths if not entry.is_symlink()}
+        if walked:
+            records = BaseParser._walk_tree(self.path, list(walked), max_workers=self.max_workers or 1)
+            for depth_step, relpath, dirnames, filenames in records:
+                walked[relpath[0]].append((depth_step - 1, relpath[1:], dirnames, filenames))
+
+        items = []
+        for info, entry in subpaths:
+            dataset = self._try_scan_subpath(entry.path, walked.get(entry.name))
+            if dataset is not None:
+                items.append(item_cls(*info, dataset=dataset))
         if self.is_mask:
-            self.mask_list = []
-            for modal in os.listdir(self.path):
-                if os.path.isdir(self._subpath(modal)):
-                    try:
-                        self.mask_list.append(MaskItem(modal, dataset=self._scan_subpath(modal)))
-                    except:
-                        # empty
-                        pass
+            self.mask_list = items
         else:
-            self.step_list = []
-            step_pattern = re.compile(r"(?P<id>[0-9]{4})_(?P<name>[a-zA-Z0-9\-]+)_(?P<annotation>[a-zA-Z0-9]+)")
-            for step in os.listdir(self.path):
-                if os.path.isdir(self._subpath(step)):
-                    matched = step_pattern.match(step)
-                    if matched:
-                        si = matched.groupdict()
-                        try:
-                            self.step_list.append(StepItem(si["id"], si["name"], si["annotation"], dataset=self._scan_subpath(step)))
-                        except:
-                            # empty
-                            pass
-
-    def _subpath(self, path):
-        return os.path.join(self.path, path)
-
-    def _scan_subpath(self, path) -> StepDataset:
-        return StepDataset(path=os.path.join(self.path, path))
+            self.step_list = items
+
+    def _scan_subpath(self, path, walked=None) -> StepDataset:
+        return StepDataset(path=path, _walked=walked)
+
+    def _try_scan_subpath(self, path, walked=None) -> Optional[StepDataset]:
+        try:
+            return self._scan_subpath(path, walked)
+        except EmptyDatasetError:
+            return None
+        except ValueError as e:
+            # not a single or multi session dataset
+            warn(f"The folder '{path}' is excluded: {e}", UserWarning)
+            return None
 
     @property
     def avail(self):
@@ -4,6 +4,8 @@ from docker.client import DockerClient
 from docker.models.containers import Container as DockerContainer
 import docker
 import time
+import queue
+import threading
 
 @dataclass
 class Node:
@@ -30,10 +32,19 @@ def get_base_url(ip: str, port: int = 2375):
 def get_ip_address(client):
     return client.info()['Swarm']['NodeAddr']
 
+def _forward_events(stream, events: queue.Queue):
+    try:
+        for event in stream:
+            events.put(event)
+    except Exception:
+        # stream closed
+        pass
+
 
 class DockerSwarmHandler:
     def __init__(self, num_containers=None):
         self.manager = docker.from_env()
+        self._client_cache = {}
         self.update_nodes()
         self.set_num_containers(num_containers)
         self.service = None
@@ -46,6 +57,7 @@ class DockerSwarmHandler:
             
     def update_nodes(self):
         self.nodes = []
+        manager_ip = get_ip_address(self.manager)
         for node in self.manager.nodes.list():
             nid = node.attrs['ID']
             node_status = node.attrs['Status']
@@ -53,51 +65,76 @@ class DockerSwarmHandler:
             node_state = node_status['State']
             
             if node_state == "ready":
-                if node_ip == get_ip_address(self.manager):
+                if node_ip == manager_ip:
                     n = self.manager
                 else:
-                    n = docker.DockerClient(base_url=get_base_url(node_ip))
+                    # reuse the client of a node seen in a previous update
+                    base_url = get_base_url(node_ip)
+                    n = self._client_cache.get(base_url)
+                    if n is None:
+                        n = self._client_cache[base_url] = docker.DockerClient(base_url=base_url)
             else:    
                 n = None
             self.nodes.append(Node(id=nid, ip=node_ip, obj=n))
+        self._nodes_by_id = {n.id: n for n in self.nodes}
             
-    def create_service(self, image, name):
+    def _watch_containers(self, name):
+        """
+        stream the container start events of the service on the manager into a queue, containers started on 
+        the other nodes are only found by the periodic check, as a remote event stream can not time out
+        """
+        events = queue.Queue()
+        filters = {'type': 'container', 'event': 'start', 
+                   'label': f'com.docker.swarm.service.name={name}'}
+        stream = self.manager.events(decode=True, filters=filters)
+        threading.Thread(target=_forward_events, args=(stream, events), daemon=True).start()
+        return events, stream
+
+    def create_service(self, image, name, timeout: Optional[float] = None):
         # remove existing service
         self.remove_service()
 
-        # create new service
-        self.service = self.manager.services.create(image, name=name, tty=True, mode=self.mode)
-        self.containers = []
-
-        # wait until node id appears
-        tasks = self.service.tasks()
-        holder = [t for t in tasks if 'NodeID' in t.keys()]
-        while len(holder) == 0:
-            time.sleep(0.1)
-            tasks = self.service.tasks()
-            holder = [t for t in tasks if 'NodeID' in t.keys()]
+        # subscribe before creating the service so that no start event is missed
+        events, stream = self._watch_containers(name)
+        try:
+            # create new service
+            self.service = self.manager.services.create(image, name=name, tty=True, mode=self.mode)
+            self.containers = []
 
-        # wait until all container active
-        running = [t for t in tasks if 'ContainerStatus' in t['Status'].keys()]
-        print('Waiting until all container active', end='')
-        while len(running) < len(tasks):
-            time.sleep(2)
+            # wait until node id appears and all container active, the tasks are checked again 
+            # when a container started on the manager, or every 2 seconds
+            deadline = None if timeout is None else time.monotonic() + timeout
+            print('Waiting until all container active', end='')
             tasks = self.service.tasks()
-            running = [t for t in tasks if 'ContainerStatus' in t['Status'].keys()]
-            print('.', end='')
-        print('ready!')
+            while not any('NodeID' in t.keys() for t in tasks) or \
+                    not all('ContainerStatus' in t['Status'].keys() for t in tasks):
+                wait = 2
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                    if wait <= 0:
+                        raise TimeoutError(f"Containers of service '{name}' are not active after {timeout} seconds.")
+                try:
+                    events.get(timeout=wait)
+                    while not events.empty():
+                        events.get_nowait()
+                except queue.Empty:
+                    pass
+                tasks = self.service.tasks()
+                print('.', end='')
+            print('ready!')
+        finally:
+            stream.close()
         
         for t in self.service.tasks():
             node_id = t['NodeID']
-            node = self.manager.nodes.get(node_id)
-            node_ip = node.attrs['Status']['Addr']
             cont_id = t['Status']['ContainerStatus']['ContainerID']
-            node = [n for n in self.nodes if n.id == node_id]
-            if len(node):
-                client = node[0].obj
+            # the node address is known since update_nodes, no need to ask the manager again
+            node = self._nodes_by_id.get(node_id)
+            if node is not None:
+                client = node.obj
                 if client:
                     container = client.containers.get(cont_id)
-                    self.containers.append(Contianer(id=cont_id, ip=node_ip, obj=container))
+                    self.containers.append(Contianer(id=cont_id, ip=node.ip, obj=container))
 
     def remove_service(self):
         if self.service:
@@ -6,3 +6,6 @@ def warn(*args, **kwargs):
 class InvalidFormatError(Exception):
     pass
 
+
+class EmptyDatasetError(ValueError):
+    pass
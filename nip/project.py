@@ -1,30 +1,67 @@
 import os
-from typing import Any
+from typing import Any, Callable, Dict, Iterator, Optional
+from functools import cached_property, partial
+from collections.abc import Mapping
 from .dataset import RawDataset, ProcDataset, StepDataset, StepItem, MaskItem
 
 
+class _LazyDict(Mapping):
+    """read-only mapping whose values are built by their factory on first access"""
+    def __init__(self, factories: Dict[str, Callable[[], Any]]):
+        self._factories = factories
+        self._values = {}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._values:
+            self._values[key] = self._factories[key]()
+        return self._values[key]
+
+    def __contains__(self, key: object) -> bool:
+        # without building the value
+        return key in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+
 class Project:
     """TODO: config file"""
     def __init__(self, path):
         self.path = os.path.abspath(path)
-        self._scan()
-
-    def _scan(self):
-        self.dataclass = {}
-        for d in os.listdir(self.path):
-            """hard coded"""
-            if d == "data":
-                try:
-                    self.dataclass[d] = RawDataset(os.path.join(self.path, d))
-                except:
-                    # no rawdata
-                    self.dataclass[d] = None
-            elif d == "proc":
-                self.dataclass[d] = ProcDataset(os.path.join(self.path, d))
-            elif d == "mask":
-                self.dataclass[d] = ProcDataset(os.path.join(self.path, d), mask=True)
-            elif d == "rst":
-                pass
+
+    @cached_property
+    def dataclass(self) -> _LazyDict:
+        # only the project folder is listed here, each dataset is parsed when accessed first
+        return self._scan()
+
+    def _scan(self) -> _LazyDict:
+        factories = {}
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                """hard coded"""
+                d = entry.name
+                if not entry.is_dir():
+                    continue
+                if d == "data":
+                    factories[d] = partial(self._load_rawdata, entry.path)
+                elif d == "proc":
+                    factories[d] = partial(ProcDataset, entry.path)
+                elif d == "mask":
+                    factories[d] = partial(ProcDataset, entry.path, mask=True)
+                elif d == "rst":
+                    pass
+        return _LazyDict(factories)
+
+    @staticmethod
+    def _load_rawdata(path: str) -> Optional[RawDataset]:
+        try:
+            return RawDataset(path)
+        except ValueError:
+            # no rawdata, or not a valid dataset (EmptyDatasetError is a ValueError)
+            return None
 
     def get_path(self, dataclass: str) -> str:
         return os.path.join(self.path, dataclass)
@@ -39,10 +76,12 @@ class Project:
         pass
 
     def reload(self):
-        self._scan()
+        # rescanned on the next access
+        self.__dict__.pop('dataclass', None)
     
     def __getattr__(self, name: str) -> Any:
-        if name in self.dataclass.keys():
+        # the datasets can not be listed before path is set (e.g. while unpickling), or while listing them failed
+        if name != 'dataclass' and 'path' in self.__dict__ and name in self.dataclass:
             return self.dataclass[name]
         else:
             raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
@@ -5,16 +5,14 @@ import asyncio
 from functools import partial
 
 class Scheduler(threading.Thread):
-    def _run_coro(self, func):
-        result = asyncio.run_coroutine_threadsafe(func, self.loop)
-        return result
-    
     def __init__(self):
         super().__init__()
         self.loop = asyncio.new_event_loop()
         self.queue = asyncio.Queue()
         self._set_name()
         self.executor = ThreadPoolExecutor(max_workers=5)
+        # references to the running coroutine tasks, the loop only keeps weak ones
+        self._tasks = set()
     
     def _set_name(self):
         self.name = 'NIPScheduler'
@@ -25,7 +23,10 @@ class Scheduler(threading.Thread):
             if isinstance(task, tuple):
                 if asyncio.iscoroutinefunction(task[0]):
                     func, args, kwargs = task
-                    result = self._run_coro(func(*args, **kwargs))
+                    # already inside the loop, schedule it directly and keep serving the queue
+                    coro_task = self.loop.create_task(func(*args, **kwargs))
+                    self._tasks.add(coro_task)
+                    coro_task.add_done_callback(self._tasks.discard)
                 elif callable(task[0]):
                     func, args, kwargs = task
                     coro = await self.loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
@@ -43,11 +44,12 @@ class Scheduler(threading.Thread):
         self.loop.run_until_complete(self._event_loop())
 
     def queue_item(self, item):
-        self._run_coro(self.queue.put(item))
+        # put_nowait never blocks on the unbounded queue, a plain callback is enough
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
         
     def _stop_event_loop(self):
         if self.loop.is_running():
-            self._run_coro(self.queue.put(0))
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, 0)
             
     def _stop_thread(self):
         if self.is_alive():
@@ -0,0 +1,179 @@
+import os
+import re
+import shutil
+import tempfile
+import time
+import unittest
+import warnings
+from unittest import mock
+
+from nip.dataset import ProcDataset, RawDataset, StepDataset, _get_combined
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'w').close()
+
+
+class TestProcDataset(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.proc = self._tmp.name
+        touch(os.path.join(self.proc, '0002_ok_b', 'sub-01', 'sub-01_desc-mc_bold.nii.gz'))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def avail(self):
+        return [f"{s.id}_{s.name}_{s.annotation}" for s in ProcDataset(self.proc).avail]
+
+    def test_empty_step_folder_is_skipped(self):
+        os.makedirs(os.path.join(self.proc, '0001_mc_a'))
+        self.assertEqual(self.avail(), ['0002_ok_b'])
+
+    def test_empty_subject_folder_is_skipped(self):
+        os.makedirs(os.path.join(self.proc, '0001_mc_a', 'sub-01'))
+        self.assertEqual(self.avail(), ['0002_ok_b'])
+
+    def test_empty_session_folder_is_skipped(self):
+        os.makedirs(os.path.join(self.proc, '0005_x_e', 'sub-01', 'ses-01'))
+        self.assertEqual(self.avail(), ['0002_ok_b'])
+
+    def test_multi_session_step_folder(self):
+        touch(os.path.join(self.proc, '0003_ms_c', 'sub-01', 'ses-01', 'sub-01_ses-01_bold.nii.gz'))
+        self.assertEqual(sorted(self.avail()), ['0002_ok_b', '0003_ms_c'])
+
+    def test_invalid_depth_step_folder_warns(self):
+        touch(os.path.join(self.proc, '0004_deep_d', 'sub-01', 'ses-01', 'func', 'sub-01_ses-01_bold.nii.gz'))
+        with self.assertWarnsRegex(UserWarning, '0004_deep_d'):
+            avail = self.avail()
+        self.assertEqual(avail, ['0002_ok_b'])
+
+
+class TestStepDataset(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.step = self._tmp.name
+        touch(os.path.join(self.step, 'sub-01', 'sub-01_desc-mc_bold.nii.gz'))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_file_without_extension(self):
+        touch(os.path.join(self.step, 'sub-01', 'noext'))
+        with warnings.catch_warnings():
+            # not a BIDS file name
+            warnings.simplefilter('ignore', UserWarning)
+            ds = StepDataset(self.step)
+        finfo = ds.filter(regex='noext').file_list[0]
+        self.assertEqual(finfo.fileext, '')
+        self.assertEqual(finfo.basename, 'noext')
+        self.assertEqual(finfo.abspath, os.path.join(self.step, 'sub-01', 'noext'))
+        self.assertEqual(finfo.modify(suffix='_x'), 'noext_x')
+
+
+class TestRawDataset(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.raw = self._tmp.name
+        for sub in ('01', '02', '03'):
+            touch(os.path.join(self.raw, f'sub-{sub}', 'anat', f'sub-{sub}_T1w.nii.gz'))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_filter_after_file_list_is_replaced(self):
+        ds = RawDataset(self.raw)
+        ds.filter(subject='sub-01')
+        ds.file_list = [f for f in ds.file_list if f.subject != 'sub-01']
+        self.assertEqual(ds.filter(subject='sub-01').file_list, [])
+        self.assertEqual([f.subject for f in ds.filter(subject='sub-03').file_list], ['sub-03'])
+
+    def test_filter_after_file_list_is_changed_in_place(self):
+        ds = RawDataset(self.raw)
+        ds.filter(subject='sub-01')
+        ds.file_list.sort(key=lambda f: f.subject, reverse=True)
+        self.assertEqual([f.subject for f in ds.filter(subject='sub-01').file_list], ['sub-01'])
+        ds.file_list[0] = ds.file_list[-1]
+        self.assertEqual([f.subject for f in ds.filter(subject='sub-03').file_list], [])
+
+    def test_warm_parse_keeps_cache_file(self):
+        # older than the racy window, so that every directory listing gets cached
+        past = time.time() - 60
+        for dirpath, _, _ in os.walk(self.raw):
+            os.utime(dirpath, (past, past))
+        RawDataset(self.raw, cache=True)
+        cache_path = os.path.join(self.raw, '.nip_cache.json')
+        # reading the cache may update its atime, only a rewrite changes the inode or mtime
+        stat = os.stat(cache_path)
+        ds = RawDataset(self.raw, cache=True)
+        stat_warm = os.stat(cache_path)
+        self.assertEqual((stat_warm.st_ino, stat_warm.st_mtime_ns), (stat.st_ino, stat.st_mtime_ns))
+        self.assertEqual(len(ds.file_list), 3)
+
+    def test_warm_parse_sees_changed_dirs(self):
+        past = time.time() - 60
+        for max_workers in (1, 4):
+            with self.subTest(max_workers=max_workers):
+                raw = os.path.join(self.raw, f'workers-{max_workers}')
+                for sub in ('01', '02', '03'):
+                    touch(os.path.join(raw, f'sub-{sub}', 'anat', f'sub-{sub}_T1w.nii.gz'))
+                for dirpath, _, _ in os.walk(raw):
+                    os.utime(dirpath, (past, past))
+                RawDataset(raw, max_workers=max_workers, cache=True)
+                touch(os.path.join(raw, 'sub-01', 'anat', 'sub-01_T2w.nii.gz'))
+                shutil.rmtree(os.path.join(raw, 'sub-02'))
+                ds = RawDataset(raw, max_workers=max_workers, cache=True)
+                self.assertEqual([s.subject for s in ds.session_list], ['sub-01', 'sub-03'])
+                self.assertEqual([f.basename for f in ds.file_list], 
+                                 ['sub-01_T1w.nii.gz', 'sub-01_T2w.nii.gz', 'sub-03_T1w.nii.gz'])
+
+
+class TestFilterPatterns(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.raw = self._tmp.name
+        for name in ('sub-01_T1w', 'sub-01_acq-aa_T1w', 'sub-01_acq-ab_T1w'):
+            touch(os.path.join(self.raw, 'sub-01', 'anat', f'{name}.nii.gz'))
+        self.ds = RawDataset(self.raw)
+        # the combined patterns are cached per process, start and leave each test without them
+        _get_combined.cache_clear()
+
+    def tearDown(self):
+        _get_combined.cache_clear()
+        self._tmp.cleanup()
+
+    def filenames(self, regex, regex_ignore):
+        return [f.filename for f in self.ds.filter(regex=regex, regex_ignore=regex_ignore).file_list]
+
+    def test_name_matching_both_patterns_is_dropped(self):
+        self.assertIsNotNone(_get_combined(r'sub-01', r'.*acq-ab'))
+        self.assertEqual(self.filenames(r'sub-01', r'.*acq-ab'), ['sub-01_T1w', 'sub-01_acq-aa_T1w'])
+
+    def test_backreference_in_regex(self):
+        self.assertIsNotNone(_get_combined(r'.*acq-(\w)\1', r'.*T2w'))
+        self.assertEqual(self.filenames(r'.*acq-(\w)\1', r'.*T2w'), ['sub-01_acq-aa_T1w'])
+
+    def test_ignore_pattern_with_groups(self):
+        self.assertIsNone(_get_combined(r'sub-01', r'.*acq-(ab)'))
+        self.assertEqual(self.filenames(r'sub-01', r'.*acq-(ab)'), ['sub-01_T1w', 'sub-01_acq-aa_T1w'])
+
+    def test_pattern_with_global_flags(self):
+        self.assertIsNone(_get_combined(r'(?i)SUB-01_ACQ', r'.*ab'))
+        self.assertEqual(self.filenames(r'(?i)SUB-01_ACQ', r'.*ab'), ['sub-01_acq-aa_T1w'])
+
+    def test_combined_pattern_failing_to_compile(self):
+        compile_ = re.compile
+
+        def compile_or_fail(pattern, *args, **kwargs):
+            if isinstance(pattern, str) and pattern.startswith('(?!'):
+                raise re.error('combined pattern')
+            return compile_(pattern, *args, **kwargs)
+
+        with mock.patch.object(re, 'compile', compile_or_fail):
+            self.assertIsNone(_get_combined(r'sub-01_', r'.*acq-a[b]'))
+            self.assertEqual(self.filenames(r'sub-01_', r'.*acq-a[b]'), ['sub-01_T1w', 'sub-01_acq-aa_T1w'])
+
+
+if __name__ == '__main__':
+    unittest.main()